@@ -1,14 +1,22 @@
 """Main application: poll file_contents queue and process files."""
+import logging
+import multiprocessing
+import os
 import sys
 import time
 import signal
+from concurrent.futures.process import BrokenProcessPool
+from logging.handlers import QueueListener
 from pathlib import Path
+from typing import Optional
 
 from src import settings
-from src.logging_conf import logger
+from src.logging_conf import logger, setup_logging
 from src.queue import QueueClient
 from src.storage import StorageClient
-from src.processor import process_file, can_generate_thumbnail, can_extract_text
+from src.processor import can_process, create_process_pool, discard_process_pool, process_files, remove_worker_dirs
+
+THUMBNAIL_CONTENT_TYPES = {".png": "image/png", ".webp": "image/webp"}
 
 
 class App:
@@ -16,13 +24,15 @@ class App:
         self.running = True
         self.queue = QueueClient()
         self.storage = StorageClient()
+        self.log_queue = None
+        self.pool = None
 
     def signal_handler(self, signum, frame):
         logger.info(f"Received signal {signum}, shutting down...")
         self.running = False
 
-    def process_queue_item(self, item: dict) -> bool:
-        """Process a single queue item from file_contents."""
+    def prepare_item(self, item: dict) -> Optional[dict]:
+        """Validate a claimed item and download its file; returns None if it needs no processing."""
         content_hash = item["content_hash"]
         storage_path = item["storage_path"]
         full_path = item.get("full_path")
@@ -31,16 +41,16 @@ class App:
         if not storage_path:
             logger.warning(f"Content {content_hash[:8]} has no storage_path, skipping")
             self.queue.mark_failed(content_hash, try_count + 1)
-            return False
+            return None
 
         # Use full_path for extension detection, fall back to storage_path
         filename = Path(full_path).name if full_path else Path(storage_path).name
 
         # Skip if file type not supported for any processing
-        if not can_generate_thumbnail(filename) and not can_extract_text(filename):
+        if not can_process(filename):
             logger.debug(f"Skipping unsupported file type: {filename}")
             self.queue.mark_completed(content_hash, None, None)
-            return True
+            return None
 
         logger.info(f"Processing: {filename} ({content_hash[:8]})")
 
@@ -48,28 +58,98 @@ class App:
         temp_file = settings.TEMP_DIR / f"{content_hash}_{filename}"
         if not self.storage.download_file(settings.STORAGE_BUCKET, storage_path, temp_file):
             self.queue.mark_failed(content_hash, try_count + 1)
-            return False
+            return None
 
-        try:
-            # Process file (pass original filename for dimension calculation)
-            thumbnail_local, extracted_text = process_file(temp_file, settings.TEMP_DIR, filename)
+        return {"content_hash": content_hash, "try_count": try_count, "filename": filename, "temp_file": temp_file}
 
-            # Upload thumbnail if generated (use content_hash as name for deduplication)
+    def upload_thumbnail(self, job: dict, thumbnail_local: Optional[Path]) -> Optional[str]:
+        """Upload a generated thumbnail; returns its storage path, or None if there was none or it failed."""
+        if not thumbnail_local or not thumbnail_local.exists():
+            return None
+
+        # Use content_hash as name for deduplication
+        suffix = thumbnail_local.suffix
+        thumbnail_storage_path = f"{job['content_hash']}{suffix}"
+        if not self.storage.upload_file(
+            settings.THUMBNAIL_BUCKET, thumbnail_storage_path, thumbnail_local, THUMBNAIL_CONTENT_TYPES[suffix]
+        ):
             thumbnail_storage_path = None
-            if thumbnail_local and thumbnail_local.exists():
-                thumbnail_storage_path = f"{content_hash}.png"
-                if not self.storage.upload_file(
-                    settings.THUMBNAIL_BUCKET, thumbnail_storage_path, thumbnail_local, "image/png"
-                ):
-                    thumbnail_storage_path = None
-                    logger.warning(f"Failed to upload thumbnail for {filename}")
-                # Clean up local thumbnail
-                thumbnail_local.unlink(missing_ok=True)
-
-            # Update file_contents record
-            if not self.queue.mark_completed(content_hash, thumbnail_storage_path, extracted_text):
-                self.queue.mark_failed(content_hash, try_count + 1)
+            logger.warning(f"Failed to upload thumbnail for {job['filename']}")
+        # Clean up local thumbnail
+        thumbnail_local.unlink(missing_ok=True)
+        return thumbnail_storage_path
+
+    def restart_pool(self):
+        """Replace a process pool that lost a worker (e.g. OOM on a huge file) with a fresh one."""
+        discard_process_pool(self.pool, settings.TEMP_DIR)
+        self.pool = create_process_pool(settings.TEMP_DIR, settings.PROCESS_WORKERS, self.log_queue)
+
+    def submit_files(self, paths: list[Path]) -> list:
+        """Submit files to the pool, restarting it first if it broke while idle (e.g. OOM-killed worker)."""
+        try:
+            return list(process_files(paths, settings.TEMP_DIR, pool=self.pool))
+        except BrokenProcessPool:
+            logger.warning("Process pool broke between batches, restarting it")
+            self.restart_pool()
+            return list(process_files(paths, settings.TEMP_DIR, pool=self.pool))
+
+    def collect_result(self, job: dict, future, completed: list, isolated: bool = False) -> bool:
+        """Wait for a job's processing result and upload its thumbnail.
+
+        Returns False if the job was lost to a crash of another worker (pool broken while it ran
+        alongside others); its temp file is kept so it can be rerun.
+        """
+        try:
+            thumbnail_local, extracted_text = future.result()
+            completed.append((job, self.upload_thumbnail(job, thumbnail_local), extracted_text))
+        except BrokenProcessPool as e:
+            if not isolated:
                 return False
+            # Ran alone and still killed its worker: this file is the culprit
+            logger.error(f"Worker died processing {job['filename']}: {e}")
+            self.queue.mark_failed(job["content_hash"], job["try_count"] + 1)
+            self.restart_pool()
+        except Exception as e:
+            logger.error(f"Error processing {job['filename']}: {e}", exc_info=True)
+            self.queue.mark_failed(job["content_hash"], job["try_count"] + 1)
+        # Clean up temp file
+        job["temp_file"].unlink(missing_ok=True)
+        return True
+
+    def process_batch(self, items: list[dict]) -> int:
+        """Download claimed items, process them in parallel, then upload and record results in claim order."""
+        jobs = []
+        for item in items:
+            if not self.running:
+                break
+            job = self.prepare_item(item)
+            if job:
+                jobs.append(job)
+
+        completed = []
+        futures = self.submit_files([job["temp_file"] for job in jobs])
+        broken = [job for job, future in zip(jobs, futures) if not self.collect_result(job, future, completed)]
+
+        if broken:
+            # One dead worker fails every job still in the pool; rerun those one at a time so only
+            # the file that actually kills a worker is charged a retry
+            logger.warning(f"Process pool broke, rerunning {len(broken)} file(s) individually")
+            self.restart_pool()
+            for job in broken:
+                future, = self.submit_files([job["temp_file"]])
+                self.collect_result(job, future, completed, isolated=True)
+
+        # Update all file_contents records of the batch at once
+        failed = set(self.queue.flush_results(
+            [(job["content_hash"], thumbnail_storage_path, extracted_text)
+             for job, thumbnail_storage_path, extracted_text in completed]
+        ))
+
+        processed = 0
+        for job, thumbnail_storage_path, extracted_text in completed:
+            if job["content_hash"] in failed:
+                self.queue.mark_failed(job["content_hash"], job["try_count"] + 1)
+                continue
 
             result_parts = []
             if thumbnail_storage_path:
@@ -77,17 +157,9 @@ class App:
             if extracted_text:
                 result_parts.append(f"text ({len(extracted_text)} chars)")
 
-            logger.info(f"Completed: {filename} - {', '.join(result_parts) if result_parts else 'no output'}")
-            return True
-
-        except Exception as e:
-            logger.error(f"Error processing {filename}: {e}", exc_info=True)
-            self.queue.mark_failed(content_hash, try_count + 1)
-            return False
-
-        finally:
-            # Clean up temp file
-            temp_file.unlink(missing_ok=True)
+            logger.info(f"Completed: {job['filename']} - {', '.join(result_parts) if result_parts else 'no output'}")
+            processed += 1
+        return processed
 
     def run(self):
         """Main run loop."""
@@ -111,7 +183,15 @@ class App:
         logger.info(f"Thumbnail size: {settings.THUMBNAIL_WIDTH}x{settings.THUMBNAIL_HEIGHT}")
         logger.info(f"Poll interval: {settings.POLL_INTERVAL}s")
 
+        # Worker processes log through a queue into this process's handlers
+        self.log_queue = multiprocessing.get_context("spawn").Queue()
+        listener = QueueListener(self.log_queue, *logging.getLogger().handlers, respect_handler_level=True)
+        listener.start()
+        self.pool = create_process_pool(settings.TEMP_DIR, settings.PROCESS_WORKERS, self.log_queue)
+
         processed_count = 0
+        # Claim at least one file per worker so a batch can keep the whole pool busy
+        claim_limit = max(5, settings.PROCESS_WORKERS or os.cpu_count() or 1)
 
         try:
             while self.running:
@@ -122,18 +202,14 @@ class App:
                     continue
 
                 # Atomically claim pending items (already marked as indexing)
-                items = self.queue.claim_pending(limit=5)
+                items = self.queue.claim_pending(limit=claim_limit)
 
                 if items:
-                    for item in items:
-                        if not self.running:
-                            break
-
-                        if self.process_queue_item(item):
-                            processed_count += 1
+                    previous_count = processed_count
+                    processed_count += self.process_batch(items)
 
-                    # Log stats periodically
-                    if processed_count > 0 and processed_count % 10 == 0:
+                    # Log stats periodically (every 10 processed files)
+                    if processed_count // 10 > previous_count // 10:
                         stats = self.queue.get_queue_stats()
                         logger.info(f"Queue stats: {stats}")
 
@@ -147,12 +223,16 @@ class App:
         except Exception as e:
             logger.error(f"Fatal error: {e}", exc_info=True)
         finally:
+            self.pool.shutdown(cancel_futures=True)
+            remove_worker_dirs(settings.TEMP_DIR)
+            listener.stop()
             self.queue.close()
             self.storage.close()
             logger.info(f"ThumbnailTextExtractor stopped. Processed {processed_count} files.")
 
 
 def main():
+    setup_logging()
     app = App()
     app.run()
 
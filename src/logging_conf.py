@@ -12,7 +12,7 @@ from src import settings
 class JSONFormatter(logging.Formatter):
     def format(self, record):
         log_data = {
-            "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat().replace("+00:00", "Z"),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -62,5 +62,7 @@ def setup_logging():
     return root_logger
 
 
-logger = setup_logging()
+# Configured by the entry point (setup_logging() in main), not at import: spawned pool workers
+# re-import the main module and must not open their own file/BetterStack handlers
+logger = logging.getLogger()
 
@@ -61,8 +61,8 @@ def request_ocr(image_path: Path) -> Optional[dict]:
     failed_file = OCR_EXCHANGE_DIR / f"{job_id}.failed"
     
     try:
-        # Copy image to exchange
-        shutil.copy2(image_path, exchange_image)
+        # Copy image to exchange (contents only; the sidecar never looks at mode or timestamps)
+        shutil.copyfile(image_path, exchange_image)
         
         # Write request
         request_data = {
@@ -40,6 +40,8 @@ LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 PROCESSOR_EXTRA_ENV = {
     "MAX_TEXT_LENGTH": os.getenv("MAX_TEXT_LENGTH", "0"),
     "OCR_MAX_PAGES": os.getenv("OCR_MAX_PAGES", "20"),
+    "THUMBNAIL_RESAMPLE": os.getenv("THUMBNAIL_RESAMPLE", "bicubic"),
+    "THUMBNAIL_FORMAT": os.getenv("THUMBNAIL_FORMAT", "PNG"),
 }
 
 # Docker volume names (must match docker-compose volume names)
@@ -157,7 +159,7 @@ while true; do
         fi
         rm -f "$f"
     done
-    sleep 0.5
+    sleep 0.1
 done
 """
         qcad_run_kwargs = {
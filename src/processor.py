@@ -3,25 +3,26 @@
 Air-gapped design: NO network calls, NO credentials, file-based I/O only.
 DWG conversion uses file-based IPC with QCAD sidecar via shared volume.
 """
+import contextlib
+import os
 import shutil
+import struct
 import subprocess
 import time
 import uuid
 import zipfile
+from concurrent.futures import Future, ProcessPoolExecutor
 from io import BytesIO
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Iterable, Iterator, Optional, Tuple
+import functools
 import logging
+import logging.handlers
+import mmap
+import multiprocessing
 
 import numpy as np
-from PIL import Image
-import pillow_heif
-import fitz  # PyMuPDF
-import olefile
-import cairosvg
-from pdf2image import convert_from_path
-
-pillow_heif.register_heif_opener()
+from PIL import ExifTags, Image, UnidentifiedImageError
 
 # Use processor_settings in air-gapped mode, fall back to main settings
 try:
@@ -33,52 +34,114 @@ from src.text_limits import truncate_text
 
 logger = logging.getLogger(__name__)
 
+# Bytes counted as printable by the text fallback: ASCII printables, tab/LF/CR and any non-ASCII (UTF-8/Latin-1) byte
+_PRINTABLE_BYTES = bytes(range(0x20, 0x7F)) + b"\t\n\r" + bytes(range(0x80, 0x100))
+TEXT_FALLBACK_PROBE_SIZE = 4096
+
+# Held around soffice calls; batch workers replace it with a shared lock (one profile, one instance)
+_office_lock = contextlib.nullcontext()
+
+# DWG content bounds are located on a grayscale render at 1/DWG_PROBE_DOWNSCALE of the intermediate DPI
+DWG_PROBE_DOWNSCALE = 8
+
+HEIF_EXTENSIONS = {".heic", ".heif"}
+
+# Container signatures checked before trying the archive/OLE thumbnail fallbacks
+ZIP_MAGIC = b"PK\x03\x04"
+OLE_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+
+# Extension -> file kind, in process_file's dispatch order (earlier entries win on overlap)
+_KIND_EXTENSIONS = (
+    ("dwg", settings.THUMBNAIL_DWG_EXTENSIONS),
+    ("office", settings.THUMBNAIL_OFFICE_EXTENSIONS),
+    ("svg", settings.THUMBNAIL_SVG_EXTENSIONS),
+    ("video", settings.THUMBNAIL_VIDEO_EXTENSIONS),
+    ("image", settings.THUMBNAIL_IMAGE_EXTENSIONS),
+    ("pdf", settings.THUMBNAIL_PDF_EXTENSIONS),
+    ("text", settings.TEXT_EXTRACT_EXTENSIONS),
+)
+_EXT_KIND = {ext: kind for kind, exts in reversed(_KIND_EXTENSIONS) for ext in exts}
+THUMBNAIL_SUFFIX = ".webp" if settings.THUMBNAIL_FORMAT == "WEBP" else ".png"
+
+_THUMBNAIL_KINDS = frozenset({"image", "pdf", "dwg", "office", "svg", "video"})
+_TEXT_KINDS = frozenset({"pdf", "text"})
+_PROCESSABLE_KINDS = _THUMBNAIL_KINDS | _TEXT_KINDS
+
 
 def get_file_extension(filename: str) -> str:
-    return Path(filename).suffix.lower()
+    return os.path.splitext(filename)[1].lower()
+
+
+def classify_ext(ext: str) -> Optional[str]:
+    return _EXT_KIND.get(ext)
+
+
+def classify(filename: str) -> Optional[str]:
+    return _EXT_KIND.get(get_file_extension(filename))
+
+
+def _thumbnail_dimensions_for_ext(ext: str) -> Tuple[int, int]:
+    if ext in settings.THUMBNAIL_SMALL_EXTENSIONS:
+        return settings.THUMBNAIL_WIDTH, settings.THUMBNAIL_HEIGHT
+    return settings.THUMBNAIL_LARGE_WIDTH, settings.THUMBNAIL_LARGE_HEIGHT
 
 
 def is_image(filename: str) -> bool:
-    return get_file_extension(filename) in settings.THUMBNAIL_IMAGE_EXTENSIONS
+    return classify(filename) == "image"
 
 
 def is_pdf(filename: str) -> bool:
-    return get_file_extension(filename) in settings.THUMBNAIL_PDF_EXTENSIONS
+    return classify(filename) == "pdf"
 
 
 def is_dwg(filename: str) -> bool:
-    return get_file_extension(filename) in settings.THUMBNAIL_DWG_EXTENSIONS
+    return classify(filename) == "dwg"
 
 
 def is_office(filename: str) -> bool:
-    return get_file_extension(filename) in settings.THUMBNAIL_OFFICE_EXTENSIONS
+    return classify(filename) == "office"
 
 
 def is_svg(filename: str) -> bool:
-    return get_file_extension(filename) in settings.THUMBNAIL_SVG_EXTENSIONS
+    return classify(filename) == "svg"
 
 
 def is_video(filename: str) -> bool:
-    return get_file_extension(filename) in settings.THUMBNAIL_VIDEO_EXTENSIONS
+    return classify(filename) == "video"
 
 
 def is_text_file(filename: str) -> bool:
-    return get_file_extension(filename) in settings.TEXT_EXTRACT_EXTENSIONS
+    return classify(filename) == "text"
 
 
 def can_generate_thumbnail(filename: str) -> bool:
-    return is_image(filename) or is_pdf(filename) or is_dwg(filename) or is_office(filename) or is_svg(filename) or is_video(filename)
+    return classify(filename) in _THUMBNAIL_KINDS
 
 
 def get_thumbnail_dimensions(filename: str) -> Tuple[int, int]:
-    ext = get_file_extension(filename)
-    if ext in settings.THUMBNAIL_SMALL_EXTENSIONS:
-        return settings.THUMBNAIL_WIDTH, settings.THUMBNAIL_HEIGHT
-    return settings.THUMBNAIL_LARGE_WIDTH, settings.THUMBNAIL_LARGE_HEIGHT
+    return _thumbnail_dimensions_for_ext(get_file_extension(filename))
 
 
 def can_extract_text(filename: str) -> bool:
-    return is_pdf(filename) or is_text_file(filename)
+    return classify(filename) in _TEXT_KINDS
+
+
+def can_process(filename: str) -> bool:
+    """True if the file yields a thumbnail or text; same as either predicate above with one lookup."""
+    return classify(filename) in _PROCESSABLE_KINDS
+
+
+def new_thumbnail_path(temp_dir: Path) -> Path:
+    return temp_dir / f"{uuid.uuid4()}{THUMBNAIL_SUFFIX}"
+
+
+def save_thumbnail(thumbnail: Image.Image, dest_path: Path) -> None:
+    if settings.THUMBNAIL_FORMAT == "WEBP":
+        thumbnail.save(dest_path, "WEBP", quality=80, method=4)
+    else:
+        # Fast zlib level: thumbnails are small and short-lived, optimize=True costs far more than it saves
+        thumbnail.save(dest_path, "PNG", optimize=False, compress_level=1)
 
 
 def create_cover_thumbnail(img: Image.Image, width: int, height: int) -> Image.Image:
@@ -88,20 +151,115 @@ def create_cover_thumbnail(img: Image.Image, width: int, height: int) -> Image.I
     if img_ratio > target_ratio:
         new_width = int(img.height * target_ratio)
         left = (img.width - new_width) // 2
-        img = img.crop((left, 0, left + new_width, img.height))
+        box = (left, 0, left + new_width, img.height)
     else:
         new_height = int(img.width / target_ratio)
         top = 0 if settings.THUMBNAIL_CROP_POSITION == "top" else (img.height - new_height) // 2
-        img = img.crop((0, top, img.width, top + new_height))
+        box = (0, top, img.width, top + new_height)
+
+    # Resize straight from the crop box (no intermediate copy); reducing_gap box-reduces
+    # large sources to ~3x the target before the filter runs
+    return img.resize((width, height), Image.Resampling[settings.THUMBNAIL_RESAMPLE], box=box, reducing_gap=3.0)
+
+
+# Modes Pillow resamples natively; these are converted to RGB after the resize, on the small image
+_RESAMPLE_MODES = frozenset({"RGBA", "LA", "RGBX", "CMYK", "YCbCr"})
+
+
+def create_rgb_cover_thumbnail(img: Image.Image, width: int, height: int) -> Image.Image:
+    """Cover thumbnail in RGB or L, converting other modes at thumbnail size where possible."""
+    if img.mode in ("RGB", "L"):
+        return create_cover_thumbnail(img, width, height)
+    if img.mode in _RESAMPLE_MODES:
+        return create_cover_thumbnail(img, width, height).convert("RGB")
+    # Palette, bilevel and 16-bit sources cannot be resampled as-is
+    return create_cover_thumbnail(img.convert("RGB"), width, height)
+
+
+def try_embedded_jpeg_thumb(img: Image.Image, width: int, height: int) -> Optional[Image.Image]:
+    """Return the EXIF-embedded JPEG preview of an opened image if it covers the target size."""
+    try:
+        raw = img.info.get("exif")
+        if not raw or not raw.startswith(b"Exif\x00\x00"):
+            return None
+        ifd1 = img.getexif().get_ifd(ExifTags.IFD.IFD1)
+        offset = ifd1.get(0x0201)  # JPEGInterchangeFormat, relative to the TIFF header
+        length = ifd1.get(0x0202)  # JPEGInterchangeFormatLength
+        if not offset or not length:
+            return None
+
+        thumb = Image.open(BytesIO(raw[6 + offset:6 + offset + length]))
+        if thumb.width < width or thumb.height < height:
+            return None
+        thumb.load()
+        return thumb
+    except Exception as e:
+        logger.debug(f"No usable EXIF thumbnail: {e}")
+        return None
 
-    return img.resize((width, height), Image.Resampling.LANCZOS)
+
+def draft_for_thumbnail(img: Image.Image, width: int, height: int) -> None:
+    if img.format == "JPEG":
+        # libjpeg scales by 1/2, 1/4 or 1/8 during DCT decoding, never below the requested size
+        img.draft("RGB", (width * 2, height * 2))
+
+
+@functools.lru_cache(maxsize=None)
+def _load_heif():
+    """Import pillow-heif and register its opener on first HEIF file, not at module import."""
+    import pillow_heif
+    pillow_heif.register_heif_opener()
+    return pillow_heif
+
+
+def open_image_for_thumbnail(source_path: Path, width: int, height: int) -> Image.Image:
+    """Open an image, letting the decoder skip resolution the thumbnail will not use."""
+    if get_file_extension(source_path.name) in HEIF_EXTENSIONS:
+        _load_heif()
+    try:
+        img = Image.open(source_path)
+    except UnidentifiedImageError:
+        # May be HEIF content under another extension; retry once the HEIF opener is registered
+        _load_heif()
+        img = Image.open(source_path)
+    if img.format == "JPEG":
+        thumb = try_embedded_jpeg_thumb(img, width, height)
+        if thumb is not None:
+            logger.debug(f"Using embedded EXIF thumbnail {thumb.size} for {source_path.name}")
+            return thumb
+        draft_for_thumbnail(img, width, height)
+    elif img.format == "HEIF":
+        # Use an embedded thumbnail stream if it is still large enough to cover the target
+        thumb = _load_heif().thumbnail(img, min_box=max(width, height))
+        if thumb is not img and thumb.width >= width and thumb.height >= height:
+            logger.debug(f"Using embedded HEIF thumbnail {thumb.size} for {source_path.name}")
+            img = thumb
+    return img
+
+
+def copy_file_fast(src: Path, dst: Path) -> None:
+    """Copy file contents in-kernel via sendfile, falling back to a 1 MiB buffered copy (no metadata)."""
+    with open(src, "rb") as fi, open(dst, "wb") as fo:
+        try:
+            size = os.fstat(fi.fileno()).st_size
+            offset = 0
+            while offset < size:
+                sent = os.sendfile(fo.fileno(), fi.fileno(), offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+        except OSError:
+            fi.seek(0)
+            fo.seek(0)
+            fo.truncate()
+            shutil.copyfileobj(fi, fo, length=1 << 20)
 
 
 def convert_dwg_to_pdf(source_path: Path) -> Optional[Path]:
     """Convert DWG/DXF to PDF using file-based IPC with QCAD sidecar.
     
     Protocol:
-    1. Copy DWG to /dwg-exchange/{job_id}.dwg
+    1. Hardlink (or copy, across filesystems) DWG to /dwg-exchange/{job_id}.dwg
     2. Create /dwg-exchange/{job_id}.convert (signal file)
     3. QCAD sidecar sees .convert, processes, creates .done or .failed
     4. Read result PDF or error
@@ -118,7 +276,10 @@ def convert_dwg_to_pdf(source_path: Path) -> Optional[Path]:
     failed_file = exchange_dir / f"{job_id}.failed"
     
     try:
-        shutil.copy2(source_path, exchange_dwg)
+        try:
+            os.link(source_path, exchange_dwg)
+        except OSError:
+            copy_file_fast(source_path, exchange_dwg)  # Exchange dir is on another volume
         signal_file.write_text(dwg_name)  # Signal contains input filename
         
         # Wait for QCAD to process (up to 5 minutes)
@@ -141,7 +302,7 @@ def convert_dwg_to_pdf(source_path: Path) -> Optional[Path]:
                 logger.warning(f"QCAD conversion failed for {source_path.name}: {error[:500]}")
                 return None
             
-            time.sleep(0.5)
+            time.sleep(0.1)
         
         logger.error(f"DWG conversion timed out for {source_path.name}")
         signal_file.unlink(missing_ok=True)
@@ -155,15 +316,21 @@ def convert_dwg_to_pdf(source_path: Path) -> Optional[Path]:
         return None
 
 
+def stderr_excerpt(stderr: Optional[bytes]) -> str:
+    """First 500 bytes of a tool's stderr for logging; only the excerpt gets decoded."""
+    return stderr[:500].decode(errors="replace") if stderr else "no output"
+
+
 def convert_office_to_pdf(source_path: Path, temp_dir: Path) -> Optional[Path]:
     try:
-        result = subprocess.run(
-            ["soffice", "--headless", "--convert-to", "pdf", "--outdir", str(temp_dir), str(source_path)],
-            capture_output=True, text=True, timeout=120
-        )
+        with _office_lock:
+            result = subprocess.run(
+                ["soffice", "--headless", "--convert-to", "pdf", "--outdir", str(temp_dir), str(source_path)],
+                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=120
+            )
         
         if result.returncode != 0:
-            logger.warning(f"LibreOffice conversion failed for {source_path.name}: {result.stderr[:500] if result.stderr else 'no output'}")
+            logger.warning(f"LibreOffice conversion failed for {source_path.name}: {stderr_excerpt(result.stderr)}")
             return None
         
         pdf_path = temp_dir / f"{source_path.stem}.pdf"
@@ -183,6 +350,7 @@ def convert_office_to_pdf(source_path: Path, temp_dir: Path) -> Optional[Path]:
 
 
 def convert_svg_to_image(source_path: Path, width: int) -> Optional[Image.Image]:
+    import cairosvg
     try:
         png_data = cairosvg.svg2png(url=str(source_path), output_width=width * 2)
         img = Image.open(BytesIO(png_data))
@@ -199,25 +367,31 @@ def convert_svg_to_image(source_path: Path, width: int) -> Optional[Image.Image]
         return None
 
 
-def extract_video_frame(source_path: Path, temp_dir: Path) -> Optional[Path]:
+def extract_video_frame(source_path: Path, temp_dir: Path,
+                        width: Optional[int] = None, height: Optional[int] = None) -> Optional[Path]:
+    """Grab a frame with ffmpeg; with a target size, ffmpeg shrinks it to ~2x cover size before encoding."""
     try:
         frame_path = temp_dir / f"{uuid.uuid4()}.png"
+        scale = []
+        if width and height:
+            # Never upscale; force_original_aspect_ratio=increase keeps the frame covering the box
+            scale = ["-vf", f"scale='min(iw,{width * 2})':'min(ih,{height * 2})':force_original_aspect_ratio=increase"]
         result = subprocess.run(
-            ["ffmpeg", "-y", "-i", str(source_path), "-ss", "00:00:01", "-frames:v", "1", "-q:v", "2", str(frame_path)],
-            capture_output=True, text=True, timeout=60
+            ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", str(source_path), "-ss", "00:00:01", "-frames:v", "1", *scale, "-q:v", "2", str(frame_path)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=60
         )
         if result.returncode == 0 and frame_path.exists():
             logger.info(f"Video frame extracted: {source_path.name}")
             return frame_path
         # Fallback: first frame
         result = subprocess.run(
-            ["ffmpeg", "-y", "-i", str(source_path), "-frames:v", "1", "-q:v", "2", str(frame_path)],
-            capture_output=True, text=True, timeout=60
+            ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", str(source_path), "-frames:v", "1", *scale, "-q:v", "2", str(frame_path)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=60
         )
         if result.returncode == 0 and frame_path.exists():
             logger.info(f"Video frame extracted (first frame): {source_path.name}")
             return frame_path
-        logger.warning(f"ffmpeg failed for {source_path.name}: {result.stderr[:500] if result.stderr else 'no output'}")
+        logger.warning(f"ffmpeg failed for {source_path.name}: {stderr_excerpt(result.stderr)}")
         return None
     except subprocess.TimeoutExpired:
         logger.error(f"Video frame extraction timed out for {source_path.name}")
@@ -228,12 +402,14 @@ def extract_video_frame(source_path: Path, temp_dir: Path) -> Optional[Path]:
 
 
 def find_content_bounds(img: Image.Image, threshold: int = 250) -> Tuple[int, int, int, int]:
-    gray = img.convert("L")
-    arr = np.array(gray)
+    return find_content_bounds_np(np.asarray(img.convert("L")), threshold)
+
+
+def find_content_bounds_np(arr: np.ndarray, threshold: int = 250) -> Tuple[int, int, int, int]:
     non_white = arr < threshold
     
     if not non_white.any():
-        return 0, 0, img.width, img.height
+        return 0, 0, arr.shape[1], arr.shape[0]
     
     rows = np.any(non_white, axis=1)
     cols = np.any(non_white, axis=0)
@@ -307,12 +483,14 @@ def find_regions_from_splits(has_content: np.ndarray, splits: list[int]) -> list
 
 
 def find_largest_content_region(img: Image.Image, threshold: int = 250) -> Tuple[int, int, int, int]:
-    gray = img.convert("L")
-    arr = np.array(gray)
+    return find_largest_content_region_np(np.asarray(img.convert("L")), threshold)
+
+
+def find_largest_content_region_np(arr: np.ndarray, threshold: int = 250) -> Tuple[int, int, int, int]:
     non_white = arr < threshold
     
     if not non_white.any():
-        return 0, 0, img.width, img.height
+        return 0, 0, arr.shape[1], arr.shape[0]
     
     row_has_content = np.any(non_white, axis=1)
     col_has_content = np.any(non_white, axis=0)
@@ -324,10 +502,10 @@ def find_largest_content_region(img: Image.Image, threshold: int = 250) -> Tuple
     col_regions = find_regions_from_splits(col_has_content, col_splits)
     
     if not row_regions or not col_regions:
-        return find_content_bounds(img, threshold)
+        return find_content_bounds_np(arr, threshold)
     
     if len(row_regions) == 1 and len(col_regions) == 1:
-        return find_content_bounds(img, threshold)
+        return find_content_bounds_np(arr, threshold)
     
     best_region = None
     best_content = 0
@@ -340,76 +518,116 @@ def find_largest_content_region(img: Image.Image, threshold: int = 250) -> Tuple
                 best_region = (col_start, row_start, col_end, row_end)
     
     if best_region is None:
-        return find_content_bounds(img, threshold)
+        return find_content_bounds_np(arr, threshold)
     
     logger.debug(f"Content region analysis: {len(row_regions)} row regions, {len(col_regions)} col regions, selected {best_region}")
     return best_region
 
 
-def crop_to_content(img: Image.Image, margin_ratio: float = 0.02) -> Image.Image:
-    left, top, right, bottom = find_largest_content_region(img, settings.DWG_WHITE_THRESHOLD)
+def add_content_margin(bounds: Tuple[int, int, int, int], width: int, height: int,
+                       margin_ratio: float = 0.02) -> Optional[Tuple[int, int, int, int]]:
+    left, top, right, bottom = bounds
     
     content_width = right - left
     content_height = bottom - top
     
     if content_width <= 0 or content_height <= 0:
-        return img
+        return None
     
     margin_x = int(content_width * margin_ratio)
     margin_y = int(content_height * margin_ratio)
     
-    left = max(0, left - margin_x)
-    top = max(0, top - margin_y)
-    right = min(img.width, right + margin_x)
-    bottom = min(img.height, bottom + margin_y)
+    return max(0, left - margin_x), max(0, top - margin_y), min(width, right + margin_x), min(height, bottom + margin_y)
+
+
+def crop_to_content(img: Image.Image, margin_ratio: float = 0.02) -> Image.Image:
+    bounds = find_largest_content_region(img, settings.DWG_WHITE_THRESHOLD)
+    box = add_content_margin(bounds, img.width, img.height, margin_ratio)
+    if box is None:
+        return img
     
-    cropped = img.crop((left, top, right, bottom))
+    cropped = img.crop(box)
     logger.debug(f"Content crop: {img.width}x{img.height} -> {cropped.width}x{cropped.height}")
     return cropped
 
 
+def render_dwg_page(page: "fitz.Page", width: int, height: int, max_dpi: int,
+                    margin_ratio: float = 0.02) -> Image.Image:
+    """Render only the main drawing region of a DWG sheet, at just enough resolution for the thumbnail.
+
+    Content bounds come from a low-res grayscale probe, so the sheet is never rasterized whole at `max_dpi`.
+    """
+    import fitz  # PyMuPDF
+    probe_dpi = max(max_dpi // DWG_PROBE_DOWNSCALE, 1)
+    probe = page.get_pixmap(dpi=probe_dpi, colorspace=fitz.csGRAY, alpha=False)
+    arr = np.frombuffer(probe.samples, np.uint8).reshape(probe.height, probe.width)
+    bounds = find_largest_content_region_np(arr, settings.DWG_WHITE_THRESHOLD)
+    box = add_content_margin(bounds, probe.width, probe.height, margin_ratio)
+    if box is None:
+        return render_pdf_page_for_thumbnail(page, width, height)
+
+    # page.rect always starts at (0, 0), so probe pixels map to points by scale alone
+    clip = fitz.Rect(box) * (72 / probe_dpi)
+    # 2x oversampling keeps thin CAD lines anti-aliased after the final resize
+    zoom = min(max_dpi / 72, max(width / clip.width, height / clip.height) * 2)
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip, alpha=False)
+    logger.debug(f"Content crop: {probe.width}x{probe.height} probe -> {pix.width}x{pix.height} at {zoom * 72:.0f} DPI")
+    return pixmap_to_image(pix)
+
+
 def extract_archive_thumbnail(source_path: Path, dest_path: Path, width: int, height: int) -> bool:
     try:
-        if not zipfile.is_zipfile(source_path):
-            logger.debug(f"Not a valid zip archive: {source_path.name}")
-            return False
-
         with zipfile.ZipFile(source_path, 'r') as zf:
-            names = zf.namelist()
+            infos = zf.NameToInfo  # name -> ZipInfo dict built while reading the central directory
             for thumb_path in settings.ARCHIVE_THUMBNAIL_PATHS:
-                if thumb_path in names:
-                    data = zf.read(thumb_path)
-                    img = Image.open(BytesIO(data))
-                    if img.mode not in ("RGB", "L"):
-                        img = img.convert("RGB")
-                    thumbnail = create_cover_thumbnail(img, width, height)
-                    thumbnail.save(dest_path, "PNG", optimize=True)
-                    logger.info(f"Extracted thumbnail from {source_path.name} ({thumb_path})")
-                    return True
+                info = infos.get(thumb_path)
+                if info is None:
+                    continue
+                with zf.open(info) as fh:
+                    img = Image.open(fh)
+                    draft_for_thumbnail(img, width, height)
+                    img.load()
+                thumbnail = create_rgb_cover_thumbnail(img, width, height)
+                save_thumbnail(thumbnail, dest_path)
+                logger.info(f"Extracted thumbnail from {source_path.name} ({thumb_path})")
+                return True
 
         logger.debug(f"No thumbnail found in archive: {source_path.name}")
         return False
 
+    except zipfile.BadZipFile:
+        logger.debug(f"Not a valid zip archive: {source_path.name}")
+        return False
     except Exception as e:
         logger.error(f"Failed to extract archive thumbnail from {source_path.name}: {e}")
         return False
 
 
+def decode_bmp(data: bytes) -> Image.Image:
+    """Decode a BMP, wrapping uncompressed 24-bit pixel rows directly instead of going through Pillow's parser."""
+    data_offset, = struct.unpack_from("<I", data, 10)
+    header_size, w, h, _, bits, compression = struct.unpack_from("<IiiHHI", data, 14)
+    if header_size >= 40 and bits == 24 and compression == 0 and w > 0 and h != 0:
+        stride = (w * 3 + 3) & ~3
+        if data_offset + stride * abs(h) <= len(data):
+            # Rows are BGR, 4-byte aligned, bottom-up unless the height is negative
+            return Image.frombuffer("RGB", (w, abs(h)), data[data_offset:], "raw", "BGR", stride, -1 if h > 0 else 1)
+    img = Image.open(BytesIO(data))
+    img.load()
+    return img
+
+
 def extract_ole_thumbnail(source_path: Path, dest_path: Path, width: int, height: int) -> bool:
+    import olefile
     try:
-        if not olefile.isOleFile(source_path):
-            return False
-
         ole = olefile.OleFileIO(source_path)
         try:
             if ole.exists('BITMAP'):
-                bmp_data = ole.openstream('BITMAP').read()
-                if bmp_data[:2] == b'BM':
-                    img = Image.open(BytesIO(bmp_data))
-                    if img.mode not in ("RGB", "L"):
-                        img = img.convert("RGB")
-                    thumbnail = create_cover_thumbnail(img, width, height)
-                    thumbnail.save(dest_path, "PNG", optimize=True)
+                data = ole.openstream('BITMAP').read()
+                if data[:2] == b'BM':
+                    img = decode_bmp(data)
+                    thumbnail = create_rgb_cover_thumbnail(img, width, height)
+                    save_thumbnail(thumbnail, dest_path)
                     logger.info(f"Extracted OLE thumbnail from {source_path.name}")
                     return True
         finally:
@@ -423,31 +641,16 @@ def extract_ole_thumbnail(source_path: Path, dest_path: Path, width: int, height
 
 
 def generate_thumbnail_from_pdf(pdf_path: Path, width: int, height: int, is_dwg: bool = False) -> Optional[Image.Image]:
-    try:
-        if is_dwg:
-            images = convert_from_path(str(pdf_path), first_page=1, last_page=1, dpi=settings.DWG_INTERMEDIATE_DPI)
-            if not images:
-                return None
-            img = images[0]
-            img = crop_to_content(img)
-        else:
-            images = convert_from_path(str(pdf_path), first_page=1, last_page=1, dpi=150)
-            if not images:
-                return None
-            img = images[0]
-        
-        return create_cover_thumbnail(img, width, height)
-    except Exception as e:
-        logger.error(f"Failed to convert PDF to thumbnail: {e}")
-        return None
+    thumbnail, _ = process_pdf(pdf_path, width, height, want_text=False, is_dwg=is_dwg)
+    return thumbnail
 
 
 def generate_thumbnail(source_path: Path, dest_path: Path, original_filename: str, temp_dir: Optional[Path] = None) -> bool:
     try:
-        ext = get_file_extension(source_path.name)
+        kind = classify(source_path.name)
         width, height = get_thumbnail_dimensions(original_filename)
 
-        if ext in settings.THUMBNAIL_DWG_EXTENSIONS:
+        if kind == "dwg":
             pdf_path = convert_dwg_to_pdf(source_path)
             if not pdf_path:
                 return False
@@ -455,73 +658,148 @@ def generate_thumbnail(source_path: Path, dest_path: Path, original_filename: st
             pdf_path.unlink(missing_ok=True)
             if thumbnail is None:
                 return False
-            thumbnail.save(dest_path, "PNG", optimize=True)
+            save_thumbnail(thumbnail, dest_path)
             return True
-        elif ext in settings.THUMBNAIL_PDF_EXTENSIONS:
+        elif kind == "pdf":
             thumbnail = generate_thumbnail_from_pdf(source_path, width, height, is_dwg=False)
             if thumbnail is None:
                 return False
-            thumbnail.save(dest_path, "PNG", optimize=True)
+            save_thumbnail(thumbnail, dest_path)
             return True
         else:
-            img = Image.open(source_path)
-            if img.mode not in ("RGB", "L"):
-                img = img.convert("RGB")
-            thumbnail = create_cover_thumbnail(img, width, height)
-            thumbnail.save(dest_path, "PNG", optimize=True)
-            return True
+            return generate_image_thumbnail(source_path, dest_path, width, height)
 
     except Exception as e:
         logger.error(f"Failed to generate thumbnail for {source_path.name}: {e}")
         return False
 
 
-def extract_text_from_pdf(source_path: Path) -> Optional[str]:
+def generate_image_thumbnail(source_path: Path, dest_path: Path, width: int, height: int) -> bool:
     try:
-        doc = fitz.open(source_path)
-        text_parts = []
-        for page in doc:
-            text = page.get_text()
-            if text.strip():
-                text_parts.append(text)
-        doc.close()
-        
-        full_text = "\n\n".join(text_parts)
+        img = open_image_for_thumbnail(source_path, width, height)
+        thumbnail = create_rgb_cover_thumbnail(img, width, height)
+        save_thumbnail(thumbnail, dest_path)
+        return True
+
+    except Exception as e:
+        logger.error(f"Failed to generate thumbnail for {source_path.name}: {e}")
+        return False
+
+
+def extract_text_from_doc(doc: "fitz.Document") -> Optional[str]:
+    page_count = doc.page_count
+    if page_count == 0:
+        return None
+    first = doc.load_page(0).get_text("text", sort=False)
+    # Scanned (image-only) documents: sample the middle and last page before walking all of them
+    if page_count > 3 and not first.strip() and not any(
+        doc.load_page(i).get_text("text", sort=False).strip() for i in (page_count // 2, page_count - 1)
+    ):
+        return None
+
+    cap = settings.MAX_TEXT_LENGTH
+    text_parts = []
+    total = 0
+    for i in range(page_count):
+        text = first if i == 0 else doc.load_page(i).get_text("text", sort=False)
+        if text.strip():
+            text_parts.append(text)
+            total += len(text) + 2
+            # Pages past the cap would only be truncated away
+            if cap is not None and total >= cap:
+                break
+
+    full_text = "\n\n".join(text_parts)
+    if '\x00' in full_text:
         full_text = full_text.replace('\x00', '')
-        full_text = truncate_text(full_text, settings.MAX_TEXT_LENGTH)
-        return full_text if full_text.strip() else None
+    full_text = truncate_text(full_text, settings.MAX_TEXT_LENGTH)
+    return full_text if full_text.strip() else None
+
+
+@contextlib.contextmanager
+def _open_pdf(path: Path) -> Iterator["fitz.Document"]:
+    """Open a PDF with PyMuPDF so one parse can serve thumbnail, text and OCR rendering."""
+    import fitz  # PyMuPDF
+    doc = fitz.open(path)
+    try:
+        yield doc
+    finally:
+        doc.close()
+
+
+def extract_text_from_pdf(source_path: Path) -> Optional[str]:
+    try:
+        with _open_pdf(source_path) as doc:
+            return extract_text_from_doc(doc)
 
     except Exception as e:
         logger.error(f"Failed to extract PDF text from {source_path.name}: {e}")
         return None
 
 
-def extract_text_from_pdf_page(source_path: Path, page_num: int = 0) -> Optional[str]:
+def pixmap_to_image(pix: "fitz.Pixmap") -> Image.Image:
+    return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+
+
+def render_pdf_page_for_thumbnail(page: "fitz.Page", width: int, height: int) -> Image.Image:
+    import fitz  # PyMuPDF
+    # Rasterize just above the size the cover crop needs instead of at a fixed DPI
+    zoom = max(width / page.rect.width, height / page.rect.height) * 1.1
+    return pixmap_to_image(page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False))
+
+
+def thumbnail_from_doc(doc: "fitz.Document", width: int, height: int,
+                       is_dwg: bool = False) -> Optional[Image.Image]:
+    """Render the cover thumbnail from the first page of an open PDF."""
+    try:
+        if is_dwg:
+            img = render_dwg_page(doc.load_page(0), width, height, settings.DWG_INTERMEDIATE_DPI)
+        else:
+            img = render_pdf_page_for_thumbnail(doc.load_page(0), width, height)
+        return create_cover_thumbnail(img, width, height)
+    except Exception as e:
+        logger.error(f"Failed to convert PDF to thumbnail: {e}")
+        return None
+
+
+def process_pdf(pdf_path: Path, width: int, height: int, want_text: bool = True,
+                is_dwg: bool = False) -> Tuple[Optional[Image.Image], Optional[str]]:
+    """Render the first-page thumbnail and extract text from a single PyMuPDF parse."""
+    thumbnail = None
+    text = None
+    try:
+        with _open_pdf(pdf_path) as doc:
+            thumbnail = thumbnail_from_doc(doc, width, height, is_dwg)
+            if want_text:
+                try:
+                    text = extract_text_from_doc(doc)
+                except Exception as e:
+                    logger.error(f"Failed to extract PDF text from {pdf_path.name}: {e}")
+    except Exception as e:
+        logger.error(f"Failed to open PDF {pdf_path.name}: {e}")
+
+    return thumbnail, text
+
+
+def extract_text_from_pdf_page(doc: "fitz.Document", page_num: int = 0) -> Optional[str]:
     """Extract text from a specific PDF page."""
     try:
-        doc = fitz.open(source_path)
         if page_num >= len(doc):
-            doc.close()
             return None
-        text = doc[page_num].get_text()
-        doc.close()
+        text = doc[page_num].get_text("text", sort=False)
         return text.replace('\x00', '') if text.strip() else None
     except Exception as e:
         logger.debug(f"Failed to extract text from page {page_num}: {e}")
         return None
 
 
-def render_pdf_page_to_image(source_path: Path, page_num: int = 0, dpi: int = 200) -> Optional[Path]:
-    """Render a PDF page to an image file for OCR."""
+def render_pdf_page_to_image(doc: "fitz.Document", dest_dir: Path, page_num: int = 0,
+                             dpi: int = 200) -> Optional[Path]:
+    """Render a PDF page to a PNG file for OCR."""
     try:
-        images = convert_from_path(str(source_path), first_page=page_num + 1, 
-                                   last_page=page_num + 1, dpi=dpi)
-        if not images:
-            return None
-        
-        # Save to temp file
-        temp_path = source_path.parent / f"ocr_page_{page_num}_{uuid.uuid4()}.png"
-        images[0].save(temp_path, "PNG")
+        pix = doc.load_page(page_num).get_pixmap(dpi=dpi, alpha=False)
+        temp_path = dest_dir / f"ocr_page_{page_num}_{uuid.uuid4()}.png"
+        pix.save(str(temp_path))
         return temp_path
     except Exception as e:
         logger.debug(f"Failed to render PDF page {page_num} to image: {e}")
@@ -541,7 +819,7 @@ def ocr_image(image_path: Path) -> Optional[dict]:
         return None
 
 
-def process_pdf_with_ocr(source_path: Path, original_extension: str) -> Optional[str]:
+def extract_pdf_text_with_ocr(doc: "fitz.Document", scratch_dir: Path, original_extension: str) -> Optional[str]:
     """
     Process PDF text extraction with OCR quality comparison.
     
@@ -554,21 +832,21 @@ def process_pdf_with_ocr(source_path: Path, original_extension: str) -> Optional
         from src.ocr_client import needs_ocr_check, should_use_ocr
     except ImportError:
         logger.debug("OCR client not available, using embedded text only")
-        return extract_text_from_pdf(source_path)
+        return extract_text_from_doc(doc)
     
     # Skip OCR check for generated PDFs (DWG, Office conversions)
     if not needs_ocr_check(original_extension):
         logger.debug(f"Skipping OCR check for generated PDF (from {original_extension})")
-        return extract_text_from_pdf(source_path)
+        return extract_text_from_doc(doc)
     
     # Get embedded text from page 1 for comparison
-    page1_embedded = extract_text_from_pdf_page(source_path, 0)
+    page1_embedded = extract_text_from_pdf_page(doc, 0)
     
     # Render page 1 to image and run OCR
-    page1_image = render_pdf_page_to_image(source_path, 0)
+    page1_image = render_pdf_page_to_image(doc, scratch_dir, 0)
     if not page1_image:
         logger.debug("Could not render PDF page for OCR comparison")
-        return extract_text_from_pdf(source_path)
+        return extract_text_from_doc(doc)
     
     try:
         ocr_result = ocr_image(page1_image)
@@ -577,11 +855,9 @@ def process_pdf_with_ocr(source_path: Path, original_extension: str) -> Optional
     
     if not ocr_result:
         logger.debug("OCR comparison failed, using embedded text")
-        return extract_text_from_pdf(source_path)
+        return extract_text_from_doc(doc)
     
-    doc = fitz.open(source_path)
     page_count = len(doc)
-    doc.close()
     
     use_ocr, reason = should_use_ocr(page1_embedded, ocr_result)
     logger.info(f"OCR decision: {reason} (embedded={len(page1_embedded or '')} chars, "
@@ -589,7 +865,7 @@ def process_pdf_with_ocr(source_path: Path, original_extension: str) -> Optional
                 f"pages={page_count})")
     
     if not use_ocr:
-        return extract_text_from_pdf(source_path)
+        return extract_text_from_doc(doc)
     
     # OCR wins — build text: OCR for first N pages, embedded for the rest
     ocr_limit = settings.OCR_MAX_PAGES
@@ -602,7 +878,7 @@ def process_pdf_with_ocr(source_path: Path, original_extension: str) -> Optional
     ocr_texts = [ocr_result.get("text", "")]
     
     for page_num in range(1, ocr_page_count):
-        page_image = render_pdf_page_to_image(source_path, page_num)
+        page_image = render_pdf_page_to_image(doc, scratch_dir, page_num)
         if page_image:
             try:
                 page_ocr = ocr_image(page_image)
@@ -613,13 +889,17 @@ def process_pdf_with_ocr(source_path: Path, original_extension: str) -> Optional
     
     # For remaining pages beyond OCR limit, use embedded text
     if page_count > ocr_limit:
+        cap = settings.MAX_TEXT_LENGTH
+        total = sum(len(t) + 2 for t in ocr_texts)
         embedded_tail_parts = []
-        doc = fitz.open(source_path)
         for page_num in range(ocr_limit, page_count):
-            text = doc[page_num].get_text()
+            # The OCR pages may already fill the cap; later pages would only be truncated away
+            if cap is not None and total >= cap:
+                break
+            text = doc[page_num].get_text("text", sort=False)
             if text.strip():
                 embedded_tail_parts.append(text.replace('\x00', ''))
-        doc.close()
+                total += len(text) + 2
         embedded_tail = "\n\n".join(embedded_tail_parts)
     else:
         embedded_tail = ""
@@ -648,16 +928,27 @@ def process_image_with_ocr(source_path: Path) -> Optional[str]:
 def extract_text_from_file(source_path: Path) -> Optional[str]:
     try:
         cap = settings.MAX_TEXT_LENGTH
-
-        def _read_text(f) -> str:
-            return f.read() if cap is None else f.read(cap)
-
-        try:
-            with open(source_path, "r", encoding="utf-8") as f:
-                text = _read_text(f)
-        except UnicodeDecodeError:
-            with open(source_path, "r", encoding="latin-1") as f:
-                text = _read_text(f)
+        with open(source_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            # The cap counts characters; UTF-8 needs at most 4 bytes for one
+            n = size if cap is None else min(size, cap * 4)
+            if n == 0:
+                return None
+            # Decode straight from the mapped pages, no intermediate bytes copy
+            with mmap.mmap(f.fileno(), n, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                try:
+                    text = str(view, "utf-8")
+                except UnicodeDecodeError as e:
+                    if n < size and e.start >= n - 3:
+                        # Cut mid-character at the byte cap, the text itself is fine
+                        text = str(view[:e.start], "utf-8")
+                    else:
+                        text = str(view, "latin-1")
+
+        text = truncate_text(text, cap)
+        if "\r" in text:
+            # Match text-mode reads (universal newlines)
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
         return text if text.strip() else None
 
     except Exception as e:
@@ -666,45 +957,72 @@ def extract_text_from_file(source_path: Path) -> Optional[str]:
 
 
 def extract_text(source_path: Path) -> Optional[str]:
-    if is_pdf(source_path.name):
+    kind = classify(source_path.name)
+    if kind == "pdf":
         return extract_text_from_pdf(source_path)
-    elif is_text_file(source_path.name):
+    elif kind == "text":
         return extract_text_from_file(source_path)
     return None
 
 
+def count_nonprintable(data: bytes) -> int:
+    return len(data.translate(None, _PRINTABLE_BYTES))
+
+
+@functools.lru_cache(maxsize=1)
+def _text_scratch() -> bytearray:
+    """Reused read buffer for extract_text_fallback, allocated on first use; larger files are never read."""
+    return bytearray(settings.TEXT_FALLBACK_MAX_SIZE)
+
+
+def _readinto_full(f, view: memoryview) -> int:
+    """Fill view from f, looping over short reads; returns the byte count (less than len(view) only at EOF)."""
+    total = 0
+    while total < len(view):
+        n = f.readinto(view[total:])
+        if not n:
+            break
+        total += n
+    return total
+
+
 def extract_text_fallback(source_path: Path) -> Optional[str]:
     try:
         file_size = source_path.stat().st_size
-        if file_size > settings.TEXT_FALLBACK_MAX_SIZE:
+        if file_size == 0 or file_size > settings.TEXT_FALLBACK_MAX_SIZE:
             return None
 
         read_n = file_size if settings.MAX_TEXT_LENGTH is None else min(file_size, settings.MAX_TEXT_LENGTH)
-        with open(source_path, "rb") as f:
-            raw_data = f.read(read_n)
+        buf = _text_scratch()
+        view = memoryview(buf)
+        with open(source_path, "rb", buffering=0) as f:
+            # Reject obvious binaries from a small prefix before reading the rest
+            probe_n = _readinto_full(f, view[:min(read_n, TEXT_FALLBACK_PROBE_SIZE)])
+            if not probe_n or buf.find(b'\x00', 0, probe_n) != -1:
+                return None
+            nonprintable = count_nonprintable(buf[:probe_n])
+            if 1 - nonprintable / probe_n < settings.TEXT_FALLBACK_MIN_PRINTABLE:
+                return None
+            n = probe_n + _readinto_full(f, view[probe_n:read_n])
 
-        if b'\x00' in raw_data:
+        # Only the tail still needs scanning
+        if buf.find(b'\x00', probe_n, n) != -1:
+            return None
+        printable_ratio = 1 - (nonprintable + count_nonprintable(buf[probe_n:n])) / n
+        if printable_ratio < settings.TEXT_FALLBACK_MIN_PRINTABLE:
             return None
 
         try:
-            text = raw_data.decode("utf-8")
+            text = str(view[:n], "utf-8")
         except UnicodeDecodeError:
             try:
-                text = raw_data.decode("latin-1")
+                text = str(view[:n], "latin-1")
             except UnicodeDecodeError:
                 return None
 
         if not text.strip():
             return None
 
-        printable_chars = sum(1 for c in text if c.isprintable() or c in '\n\r\t')
-        printable_ratio = printable_chars / len(text) if text else 0
-
-        if printable_ratio < settings.TEXT_FALLBACK_MIN_PRINTABLE:
-            return None
-
-        text = text.replace('\x00', '')
-
         logger.info(f"Extracted text from unknown format {source_path.name} ({len(text)} chars, {printable_ratio:.0%} printable)")
         return text
 
@@ -713,109 +1031,181 @@ def extract_text_fallback(source_path: Path) -> Optional[str]:
         return None
 
 
+def process_converted_pdf(pdf_path: Path, temp_dir: Path, width: int, height: int,
+                          is_dwg: bool = False) -> Tuple[Optional[Path], Optional[str]]:
+    """Render thumbnail and extract text from a generated PDF, saving the thumbnail once."""
+    thumbnail, extracted_text = process_pdf(pdf_path, width, height, want_text=True, is_dwg=is_dwg)
+
+    thumbnail_path = None
+    if thumbnail:
+        thumb_path = new_thumbnail_path(temp_dir)
+        save_thumbnail(thumbnail, thumb_path)
+        thumbnail_path = thumb_path
+    return thumbnail_path, extracted_text
+
+
 def process_file(source_path: Path, temp_dir: Path, original_filename: Optional[str] = None, 
                   original_extension: Optional[str] = None) -> Tuple[Optional[Path], Optional[str]]:
     """Process a file: generate thumbnail and extract text (with OCR when appropriate)."""
     thumbnail_path = None
     extracted_text = None
     filename = original_filename or source_path.name
-    orig_ext = original_extension or get_file_extension(filename)
-    width, height = get_thumbnail_dimensions(filename)
+    ext = get_file_extension(source_path.name)
+    name_ext = ext if filename == source_path.name else get_file_extension(filename)
+    orig_ext = original_extension or name_ext
+    width, height = _thumbnail_dimensions_for_ext(name_ext)
+    kind = classify_ext(ext)
 
     # DWG: convert once, use for both (no OCR needed - generated PDF has perfect text)
-    if is_dwg(source_path.name):
+    if kind == "dwg":
         pdf_path = convert_dwg_to_pdf(source_path)
         if pdf_path:
-            thumb_name = f"{uuid.uuid4()}.png"
-            thumb_path = temp_dir / thumb_name
-            thumbnail = generate_thumbnail_from_pdf(pdf_path, width, height, is_dwg=True)
-            if thumbnail:
-                thumbnail.save(thumb_path, "PNG", optimize=True)
-                thumbnail_path = thumb_path
-            extracted_text = extract_text_from_pdf(pdf_path)
+            thumbnail_path, extracted_text = process_converted_pdf(pdf_path, temp_dir, width, height, is_dwg=True)
             pdf_path.unlink(missing_ok=True)
         return thumbnail_path, extracted_text
 
     # Office: convert to PDF, then process (no OCR needed - generated PDF has perfect text)
-    if is_office(source_path.name):
+    if kind == "office":
         pdf_path = convert_office_to_pdf(source_path, temp_dir)
         if pdf_path:
-            thumb_name = f"{uuid.uuid4()}.png"
-            thumb_path = temp_dir / thumb_name
-            thumbnail = generate_thumbnail_from_pdf(pdf_path, width, height, is_dwg=False)
-            if thumbnail:
-                thumbnail.save(thumb_path, "PNG", optimize=True)
-                thumbnail_path = thumb_path
-            extracted_text = extract_text_from_pdf(pdf_path)
+            thumbnail_path, extracted_text = process_converted_pdf(pdf_path, temp_dir, width, height, is_dwg=False)
             pdf_path.unlink(missing_ok=True)
         return thumbnail_path, extracted_text
 
     # SVG: convert via cairosvg (no text to extract)
-    if is_svg(source_path.name):
+    if kind == "svg":
         img = convert_svg_to_image(source_path, width)
         if img:
-            thumb_name = f"{uuid.uuid4()}.png"
-            thumb_path = temp_dir / thumb_name
+            thumb_path = new_thumbnail_path(temp_dir)
             thumbnail = create_cover_thumbnail(img, width, height)
-            thumbnail.save(thumb_path, "PNG", optimize=True)
+            save_thumbnail(thumbnail, thumb_path)
             thumbnail_path = thumb_path
         return thumbnail_path, None
 
     # Video: extract frame (no text to extract)
-    if is_video(source_path.name):
-        frame_path = extract_video_frame(source_path, temp_dir)
+    if kind == "video":
+        frame_path = extract_video_frame(source_path, temp_dir, width, height)
         if frame_path:
-            thumb_name = f"{uuid.uuid4()}.png"
-            thumb_path = temp_dir / thumb_name
+            thumb_path = new_thumbnail_path(temp_dir)
             img = Image.open(frame_path)
-            if img.mode not in ("RGB", "L"):
-                img = img.convert("RGB")
-            thumbnail = create_cover_thumbnail(img, width, height)
-            thumbnail.save(thumb_path, "PNG", optimize=True)
+            thumbnail = create_rgb_cover_thumbnail(img, width, height)
+            save_thumbnail(thumbnail, thumb_path)
             thumbnail_path = thumb_path
             frame_path.unlink(missing_ok=True)
         return thumbnail_path, None
 
     # Images: generate thumbnail AND run OCR
-    if is_image(source_path.name):
-        thumb_name = f"{uuid.uuid4()}.png"
-        thumb_path = temp_dir / thumb_name
-        if generate_thumbnail(source_path, thumb_path, filename, temp_dir):
+    if kind == "image":
+        thumb_path = new_thumbnail_path(temp_dir)
+        if generate_image_thumbnail(source_path, thumb_path, width, height):
             thumbnail_path = thumb_path
         # Always OCR images
         extracted_text = process_image_with_ocr(source_path)
         return thumbnail_path, extracted_text
 
     # PDF: generate thumbnail and extract text with OCR comparison
-    if is_pdf(source_path.name):
-        thumb_name = f"{uuid.uuid4()}.png"
-        thumb_path = temp_dir / thumb_name
-        if generate_thumbnail(source_path, thumb_path, filename, temp_dir):
-            thumbnail_path = thumb_path
-        # Extract text with OCR quality comparison
-        extracted_text = process_pdf_with_ocr(source_path, orig_ext)
+    if kind == "pdf":
+        try:
+            with _open_pdf(source_path) as doc:
+                thumbnail = thumbnail_from_doc(doc, width, height)
+                if thumbnail:
+                    thumb_path = new_thumbnail_path(temp_dir)
+                    save_thumbnail(thumbnail, thumb_path)
+                    thumbnail_path = thumb_path
+                # Extract text with OCR quality comparison, reusing the same parse
+                extracted_text = extract_pdf_text_with_ocr(doc, temp_dir, orig_ext)
+        except Exception as e:
+            logger.error(f"Failed to process PDF {source_path.name}: {e}")
         return thumbnail_path, extracted_text
 
     # Text files: extract directly (no OCR needed)
-    if is_text_file(source_path.name):
+    if kind == "text":
         extracted_text = extract_text_from_file(source_path)
         return None, extracted_text
 
-    # Fallback: zip-based formats (thumbnails only)
-    thumb_name = f"{uuid.uuid4()}.png"
-    thumb_path = temp_dir / thumb_name
-    if extract_archive_thumbnail(source_path, thumb_path, width, height):
-        thumbnail_path = thumb_path
+    # Fallbacks: sniff the magic bytes once so only the matching container parser runs
+    with open(source_path, "rb") as f:
+        head = f.read(len(OLE_MAGIC))
 
-    # Fallback: OLE compound documents (thumbnails only)
-    if thumbnail_path is None:
-        thumb_name = f"{uuid.uuid4()}.png"
-        thumb_path = temp_dir / thumb_name
+    # Zip-based formats (thumbnails only)
+    if head.startswith(ZIP_MAGIC):
+        thumb_path = new_thumbnail_path(temp_dir)
+        if extract_archive_thumbnail(source_path, thumb_path, width, height):
+            thumbnail_path = thumb_path
+        return thumbnail_path, None
+
+    # OLE compound documents (thumbnails only)
+    if head.startswith(OLE_MAGIC):
+        thumb_path = new_thumbnail_path(temp_dir)
         if extract_ole_thumbnail(source_path, thumb_path, width, height):
             thumbnail_path = thumb_path
+        return thumbnail_path, None
 
-    # Fallback: unknown text formats
-    if extracted_text is None:
-        extracted_text = extract_text_fallback(source_path)
+    # Unknown text formats
+    extracted_text = extract_text_fallback(source_path)
+    return None, extracted_text
 
-    return thumbnail_path, extracted_text
+
+_worker_dir: Optional[Path] = None
+
+
+def _init_batch_worker(office_lock, temp_dir: Path, log_queue=None, log_level: int = logging.INFO) -> None:
+    global _office_lock, _worker_dir
+    _office_lock = office_lock
+    # Each worker process gets its own scratch dir, created once and reused for every file it handles
+    _worker_dir = temp_dir / f"worker_{os.getpid()}"
+    _worker_dir.mkdir(parents=True, exist_ok=True)
+    if log_queue is not None:
+        # Hand records to the parent's handlers instead of configuring logging in every worker
+        root = logging.getLogger()
+        for handler in root.handlers:
+            handler.close()
+        root.handlers = [logging.handlers.QueueHandler(log_queue)]
+        root.setLevel(log_level)
+
+
+def _process_file_worker(source_path: Path) -> Tuple[Optional[Path], Optional[str]]:
+    return process_file(source_path, _worker_dir)
+
+
+def create_process_pool(temp_dir: Path, workers: Optional[int] = None, log_queue=None) -> ProcessPoolExecutor:
+    """Start a pool of processor workers for process_files.
+
+    Workers are spawned rather than forked so each one imports PyMuPDF/pillow-heif once and
+    never inherits MuPDF state from the parent. LibreOffice conversions are serialized across
+    workers; DWG jobs are already queued one at a time by the QCAD watcher. Pass a spawn-context
+    queue as `log_queue` to receive worker log records in the parent (see logging.handlers.QueueListener).
+    """
+    ctx = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=ctx,
+                               initializer=_init_batch_worker,
+                               initargs=(ctx.Lock(), temp_dir, log_queue, logging.getLogger().getEffectiveLevel()))
+
+
+def discard_process_pool(pool: ProcessPoolExecutor, temp_dir: Path) -> None:
+    """Shut down a pool broken by a dead worker and remove its workers' scratch dirs.
+
+    Call before starting the replacement pool: every worker_<pid> dir under temp_dir is removed.
+    """
+    pool.shutdown(wait=True, cancel_futures=True)  # the executor has already terminated the surviving workers
+    remove_worker_dirs(temp_dir)
+
+
+def remove_worker_dirs(temp_dir: Path) -> None:
+    """Remove the worker_<pid> scratch dirs; only call while no pool on temp_dir is running."""
+    for worker_dir in temp_dir.glob("worker_*"):
+        shutil.rmtree(worker_dir, ignore_errors=True)
+
+
+def process_files(paths: Iterable[Path], temp_dir: Path, workers: Optional[int] = None,
+                  pool: Optional[ProcessPoolExecutor] = None) -> Iterator["Future[Tuple[Optional[Path], Optional[str]]]"]:
+    """Process a batch of files in parallel, yielding one future per path in input order.
+
+    A future's result() returns that file's process_file result or re-raises its error, so one bad file
+    does not abort the batch. Without `pool`, a temporary pool is started for this batch.
+    """
+    if pool is not None:
+        yield from [pool.submit(_process_file_worker, path) for path in paths]
+        return
+    with create_process_pool(temp_dir, workers) as pool:
+        yield from process_files(paths, temp_dir, pool=pool)
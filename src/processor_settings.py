@@ -15,6 +15,8 @@ THUMBNAIL_LARGE_HEIGHT = int(os.getenv("THUMBNAIL_LARGE_HEIGHT", "600"))
 THUMBNAIL_SMALL_EXTENSIONS_RAW = os.getenv("THUMBNAIL_SMALL_EXTENSIONS", "pdf,png,jpg,jpeg,heic,heif,gif,svg")
 THUMBNAIL_SMALL_EXTENSIONS = {f".{ext.strip().lower()}" for ext in THUMBNAIL_SMALL_EXTENSIONS_RAW.split(",") if ext.strip()}
 THUMBNAIL_CROP_POSITION = os.getenv("THUMBNAIL_CROP_POSITION", "top")
+THUMBNAIL_RESAMPLE = os.getenv("THUMBNAIL_RESAMPLE", "bicubic").upper()
+THUMBNAIL_FORMAT = os.getenv("THUMBNAIL_FORMAT", "PNG").upper()
 
 # DWG processing
 DWG_INTERMEDIATE_DPI = int(os.getenv("DWG_INTERMEDIATE_DPI", "600"))
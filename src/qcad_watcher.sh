@@ -48,6 +48,6 @@ while true; do
         fi
     done
     
-    sleep 0.5
+    sleep 0.1
 done
 
@@ -1,11 +1,14 @@
 """Queue operations via Supabase REST API using file_contents.processing_status."""
+import gzip
 import httpx
+import orjson
 from datetime import datetime, timezone
 from typing import Any
 
 from src import settings
 from src.logging_conf import logger
 
+GZIP_MIN_BYTES = 2048  # Smaller bodies are not worth compressing
 
 
 class QueueClient:
@@ -19,13 +22,45 @@ class QueueClient:
             "Content-Type": "application/json",
             "Prefer": "return=representation",
         }
-        self._client = httpx.Client(timeout=30.0)
+        # One pooled HTTP/2 connection carries the claim/patch/stats calls; keep it warm between polls
+        self._client = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=20, keepalive_expiry=60),
+            timeout=httpx.Timeout(30.0, connect=5.0, pool=5.0),
+        )
+        self._stats_rpc = True  # cleared if get_file_content_stats is not deployed
+        self._gzip_bodies = settings.GZIP_REQUEST_BODIES  # cleared if the gateway rejects a compressed body
+        self._complete_rpc = True  # cleared if complete_file_contents is not deployed
+
+    def _send_json(self, method: str, url: str, payload: Any, headers: dict[str, str] | None = None,
+                   **kwargs: Any) -> httpx.Response:
+        """Send a JSON body, gzip-compressed (level 1) when it is large and GZIP_REQUEST_BODIES is on."""
+        headers = headers or self.headers
+        body = orjson.dumps(payload)
+        if self._gzip_bodies and len(body) > GZIP_MIN_BYTES:
+            response = self._client.request(method, url, headers={**headers, "Content-Encoding": "gzip"},
+                                            content=gzip.compress(body, compresslevel=1), **kwargs)
+            if not self._rejects_gzip(response):
+                return response
+            logger.warning(f"Compressed request body rejected ({response.status_code}), sending uncompressed from now on")
+            self._gzip_bodies = False
+        return self._client.request(method, url, headers=headers, content=body, **kwargs)
+
+    @staticmethod
+    def _rejects_gzip(response: httpx.Response) -> bool:
+        """True if the gateway could not inflate the body, as opposed to rejecting the data itself."""
+        if response.status_code == 415:
+            return True
+        if response.status_code != 400:
+            return False
+        body = response.text.lower()
+        return "content-encoding" in body or "gzip" in body
 
     def claim_pending(self, limit: int = 5) -> list[dict[str, Any]]:
         """Atomically claim pending items (SELECT FOR UPDATE SKIP LOCKED + mark as indexing)."""
         try:
             url = f"{self.base_url}/rpc/claim_pending_file_content"
-            response = self._client.post(url, headers=self.headers, json={"p_limit": limit})
+            response = self._client.post(url, headers=self.headers, content=orjson.dumps({"p_limit": limit}))
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -37,25 +72,73 @@ class QueueClient:
         try:
             url = f"{self.base_url}/file_contents"
             params = {"content_hash": f"eq.{content_hash}"}
-            now = datetime.now(timezone.utc).isoformat()
-            data = {
-                "processing_status": "done",
-                "last_status_change": now,
-                "db_updated_at": now
-            }
-            if thumbnail_path is not None:
-                data["thumbnail_path"] = thumbnail_path
-                data["thumbnail_generated_at"] = now
-            if extracted_text is not None:
-                data["extracted_text"] = extracted_text
-            
-            response = self._client.patch(url, headers=self.headers, params=params, json=data)
+            data = self._completed_data(thumbnail_path, extracted_text, datetime.now(timezone.utc).isoformat())
+            response = self._send_json("PATCH", url, data, params=params)
             response.raise_for_status()
             return True
         except Exception as e:
             logger.error(f"Failed to mark {content_hash[:8]} as completed: {e}")
             return False
 
+    def flush_results(self, results: list[tuple[str, str | None, str | None]]) -> list[str]:
+        """Mark a batch of (content_hash, thumbnail_path, extracted_text) items as done.
+
+        Uses one call to the complete_file_contents RPC (p_rows: array of {content_hash, thumbnail_path,
+        extracted_text}; UPDATEs the existing rows like mark_completed, never inserts). Databases without that function fall
+        back to PATCHes keyed on content_hash=in.(...), one per distinct result, so items without output
+        share a single request. Returns the hashes that could not be written.
+        """
+        if not results:
+            return []
+
+        if self._complete_rpc:
+            url = f"{self.base_url}/rpc/complete_file_contents"
+            rows = [{"content_hash": content_hash, "thumbnail_path": thumbnail_path, "extracted_text": extracted_text}
+                    for content_hash, thumbnail_path, extracted_text in results]
+            try:
+                response = self._send_json("POST", url, {"p_rows": rows},
+                                           {**self.headers, "Prefer": "return=minimal"})
+                if response.status_code == 404:
+                    logger.info("complete_file_contents RPC not available, using PATCH per result")
+                    self._complete_rpc = False
+                else:
+                    response.raise_for_status()
+                    return []
+            except Exception as e:
+                logger.warning(f"Bulk completion of {len(results)} items failed, using PATCH per result: {e}")
+
+        url = f"{self.base_url}/file_contents"
+        now = datetime.now(timezone.utc).isoformat()
+        groups: dict[bytes, tuple[dict[str, Any], list[str]]] = {}
+        for content_hash, thumbnail_path, extracted_text in results:
+            data = self._completed_data(thumbnail_path, extracted_text, now)
+            groups.setdefault(orjson.dumps(data), (data, []))[1].append(content_hash)
+
+        failed = []
+        for data, hashes in groups.values():
+            try:
+                # PATCH only touches existing rows: one deleted mid-processing is not recreated
+                response = self._send_json("PATCH", url, data, params={"content_hash": f"in.({','.join(hashes)})"})
+                response.raise_for_status()
+            except Exception as e:
+                logger.error(f"Failed to mark {len(hashes)} item(s) as completed: {e}")
+                failed.extend(hashes)
+        return failed
+
+    @staticmethod
+    def _completed_data(thumbnail_path: str | None, extracted_text: str | None, now: str) -> dict[str, Any]:
+        data = {
+            "processing_status": "done",
+            "last_status_change": now,
+            "db_updated_at": now
+        }
+        if thumbnail_path is not None:
+            data["thumbnail_path"] = thumbnail_path
+            data["thumbnail_generated_at"] = now
+        if extracted_text is not None:
+            data["extracted_text"] = extracted_text
+        return data
+
     def mark_failed(self, content_hash: str, try_count: int) -> bool:
         """Mark item as error or back to pending for retry."""
         try:
@@ -70,7 +153,7 @@ class QueueClient:
                 "last_status_change": now,
                 "db_updated_at": now
             }
-            response = self._client.patch(url, headers=self.headers, params=params, json=data)
+            response = self._client.patch(url, headers=self.headers, params=params, content=orjson.dumps(data))
             response.raise_for_status()
             return True
         except Exception as e:
@@ -78,11 +161,28 @@ class QueueClient:
             return False
 
     def get_queue_stats(self) -> dict[str, int]:
-        """Get queue statistics for monitoring."""
+        """Get queue statistics for monitoring.
+
+        Uses one call to the get_file_content_stats RPC (processing_status, count of uploaded
+        rows grouped by status). Databases without that function fall back to one HEAD count per status.
+        """
         try:
             stats = {"pending": 0, "indexing": 0, "done": 0, "error": 0}
+
+            if self._stats_rpc:
+                url = f"{self.base_url}/rpc/get_file_content_stats"
+                response = self._client.post(url, headers=self.headers)
+                if response.status_code == 404:
+                    logger.info("get_file_content_stats RPC not available, using per-status counts")
+                    self._stats_rpc = False
+                else:
+                    response.raise_for_status()
+                    for row in response.json():
+                        if row["processing_status"] in stats:
+                            stats[row["processing_status"]] = int(row["count"])
+                    return stats
+
             url = f"{self.base_url}/file_contents"
-            
             for status in stats.keys():
                 params = {"processing_status": f"eq.{status}", "s3_status": "eq.uploaded", "select": "content_hash"}
                 headers = {**self.headers, "Prefer": "count=exact"}
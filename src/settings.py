@@ -3,7 +3,10 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 
-load_dotenv()
+# Spawned pool workers inherit the parent's environment, so only the first process parses .env
+if not os.environ.get("_TTE_DOTENV_LOADED"):
+    load_dotenv()
+    os.environ["_TTE_DOTENV_LOADED"] = "1"
 
 from src.text_limits import max_text_length_cap
 
@@ -38,6 +41,8 @@ THUMBNAIL_LARGE_HEIGHT = int(os.getenv("THUMBNAIL_LARGE_HEIGHT", "600"))
 THUMBNAIL_SMALL_EXTENSIONS_RAW = os.getenv("THUMBNAIL_SMALL_EXTENSIONS", "pdf,png,jpg,jpeg,heic,heif,gif,svg")
 THUMBNAIL_SMALL_EXTENSIONS = {f".{ext.strip().lower()}" for ext in THUMBNAIL_SMALL_EXTENSIONS_RAW.split(",") if ext.strip()}
 THUMBNAIL_CROP_POSITION = os.getenv("THUMBNAIL_CROP_POSITION", "top")  # "top" or "center"
+THUMBNAIL_RESAMPLE = os.getenv("THUMBNAIL_RESAMPLE", "bicubic").upper()  # PIL resampling filter, e.g. "bicubic" or "lanczos"
+THUMBNAIL_FORMAT = os.getenv("THUMBNAIL_FORMAT", "PNG").upper()  # "PNG" or "WEBP"
 # DWG processing: high-res intermediate for content-aware cropping
 DWG_INTERMEDIATE_DPI = int(os.getenv("DWG_INTERMEDIATE_DPI", "600"))
 DWG_WHITE_THRESHOLD = int(os.getenv("DWG_WHITE_THRESHOLD", "250"))  # Pixel value above which is considered "white"
@@ -46,6 +51,8 @@ TEXT_FALLBACK_MAX_SIZE = int(os.getenv("TEXT_FALLBACK_MAX_SIZE", "204800"))  # 2
 TEXT_FALLBACK_MIN_PRINTABLE = float(os.getenv("TEXT_FALLBACK_MIN_PRINTABLE", "0.99"))  # 99% printable chars required
 OCR_MAX_PAGES = int(os.getenv("OCR_MAX_PAGES", "20"))
 POLL_INTERVAL = int(os.getenv("POLL_INTERVAL", "5"))
+GZIP_REQUEST_BODIES = os.getenv("GZIP_REQUEST_BODIES", "false").lower() == "true"  # Only if the API gateway inflates request bodies
+PROCESS_WORKERS = int(os.getenv("PROCESS_WORKERS", "0")) or None  # Parallel file processors (0 = one per CPU)
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
 
 # Supported formats
@@ -79,6 +86,9 @@ def validate_config():
         errors.append("SUPABASE_URL is required")
     if not SUPABASE_SERVICE_KEY:
         errors.append("SUPABASE_SERVICE_KEY is required")
+    from PIL import Image
+    if THUMBNAIL_RESAMPLE not in Image.Resampling.__members__:
+        errors.append(f"THUMBNAIL_RESAMPLE must be one of {', '.join(Image.Resampling.__members__).lower()}")
     if errors:
         raise ValueError("Configuration errors:\n  " + "\n  ".join(errors))
 